@@ -1,19 +1,29 @@
 import asyncio
 from contextlib import asynccontextmanager
+import functools
+import logging
+import multiprocessing
 from multiprocessing import Process, Queue
+from multiprocessing.connection import Connection
 from multiprocessing.synchronize import Event
 import os
-from queue import Empty
 import queue
 import signal
 import sys
 import threading
 import time
 import traceback
-from typing import AsyncGenerator, Dict, TypedDict
-from fastapi import FastAPI, Response, BackgroundTasks, HTTPException
+from typing import Any, AsyncGenerator, Callable, Dict, Optional, TypedDict, Union, cast
+from fastapi import Depends, FastAPI, Request, Response, BackgroundTasks, HTTPException
+from fastapi.exceptions import RequestValidationError
 from fastapi.responses import StreamingResponse
-import json
+import orjson
+from pydantic import BaseModel, ValidationError
+
+try:
+    import uvloop
+except ImportError:  # uvloop is not available on Windows
+    uvloop = None
 
 from langwatch_nlp.studio.dspy.evaluation import EvaluationReporting
 from langwatch_nlp.studio.execute.execute_component import execute_component
@@ -26,32 +36,62 @@ from langwatch_nlp.studio.execute.execute_optimization import (
     error_optimization_event,
     execute_optimization,
 )
-from langwatch_nlp.studio.process_pool import IsolatedProcessPool
+from langwatch_nlp.studio.process_pool import (
+    BatchedQueue,
+    IsolatedProcessPool,
+    PipeReader,
+)
 from langwatch_nlp.studio.types.events import (
     Debug,
     DebugPayload,
     Done,
+    ExecuteComponent,
+    ExecuteComponentPayload,
+    ExecuteEvaluationPayload,
+    ExecuteFlow,
+    ExecuteFlowPayload,
     ExecuteOptimization,
+    ExecuteOptimizationPayload,
     ExecutionStateChange,
     IsAliveResponse,
     StopEvaluationExecution,
+    StopEvaluationExecutionPayload,
     StopExecution,
+    StopExecutionPayload,
     StopOptimizationExecution,
+    StopOptimizationExecutionPayload,
     StudioClientEvent,
     StudioServerEvent,
     Error,
     ErrorPayload,
     component_error_event,
+    now_ms,
+    studio_client_event_adapter,
 )
 
 
-pool: IsolatedProcessPool[StudioClientEvent, StudioServerEvent]
+logger = logging.getLogger(__name__)
+
+pool: IsolatedProcessPool[bytes, list[StudioServerEvent]]
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     global pool
-    pool = IsolatedProcessPool(event_worker, size=4)
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter("%(levelname)s:     %(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+
+    # Import the heavy modules (dspy, langwatch, litellm, etc) once on the forkserver,
+    # so workers forked from it are ready right away and share that memory
+    multiprocessing.set_forkserver_preload(
+        ["langwatch_nlp.error_tracking", "langwatch_nlp.studio.app"]
+    )
+    pool = IsolatedProcessPool(
+        event_worker, max_concurrent_spawns=4, min_idle=1
+    )
 
     if os.getenv("RUNNING_IN_DOCKER"):
         signal.signal(signal.SIGTERM, shutdown_handler)
@@ -65,79 +105,85 @@ async def lifespan(app: FastAPI):
 app = FastAPI(lifespan=lifespan)
 
 
+async def is_alive(_payload, _queue: "BatchedQueue[StudioServerEvent]"):
+    yield IsAliveResponse()
+
+
+EventHandler = Callable[
+    [Any, "BatchedQueue[StudioServerEvent]"], AsyncGenerator[StudioServerEvent, None]
+]
+
+_HANDLERS: Dict[str, EventHandler] = {
+    "is_alive": is_alive,
+    "execute_component": lambda payload, _queue: execute_component(payload),
+    "execute_flow": execute_flow,
+    "execute_evaluation": execute_evaluation,
+    "execute_optimization": execute_optimization,
+}
+
+
 async def execute_event(
     event: StudioClientEvent,
-    queue: "Queue[StudioServerEvent]",
-) -> AsyncGenerator[StudioServerEvent, None]:
-    yield Debug(payload=DebugPayload(message="server starting execution"))
-
-    try:
-        match event.type:
-            case "is_alive":
-                yield IsAliveResponse()
-            case "execute_component":
-                try:
-                    async for event_ in execute_component(event.payload):
-                        yield event_
-                except Exception as e:
-                    yield component_error_event(
+    queue: "BatchedQueue[StudioServerEvent]",
+) -> None:
+    queue.put(Debug(payload=DebugPayload(message="server starting execution")))
+
+    handler = _HANDLERS.get(event.type)
+    if handler is None:
+        queue.put(
+            Error(
+                payload=ErrorPayload(
+                    message=f"Unknown event type from client: {event.type}"
+                )
+            )
+        )
+    else:
+        try:
+            async for event_ in handler(event.payload, queue):
+                queue.put(event_)
+        except Exception as e:
+            traceback.print_exc()
+            if isinstance(event, ExecuteComponent):
+                queue.put(
+                    component_error_event(
                         trace_id=event.payload.trace_id,
                         node_id=event.payload.node_id,
                         error=repr(e),
                     )
-            case "execute_flow":
-                try:
-                    async for event_ in execute_flow(event.payload, queue):
-                        yield event_
-                except Exception as e:
-                    traceback.print_exc()
-                    yield Error(payload=ErrorPayload(message=repr(e)))
-            case "execute_evaluation":
-                try:
-                    async for event_ in execute_evaluation(event.payload, queue):
-                        yield event_
-                except Exception as e:
-                    yield Error(payload=ErrorPayload(message=repr(e)))
-            case "execute_optimization":
-                try:
-                    async for event_ in execute_optimization(event.payload, queue):
-                        yield event_
-                except Exception as e:
-                    yield Error(payload=ErrorPayload(message=repr(e)))
-            case _:
-                yield Error(
-                    payload=ErrorPayload(
-                        message=f"Unknown event type from client: {event.type}"
-                    )
                 )
+            else:
+                queue.put(Error(payload=ErrorPayload(message=repr(e))))
 
-    except Exception as e:
-        yield Error(payload=ErrorPayload(message=repr(e)))
-
-    yield Done()
+    queue.put(Done())
 
 
 def event_worker(
     ready_event: Event,
-    queue_in: "Queue[StudioClientEvent | None]",
-    queue_out: "Queue[StudioServerEvent]",
+    queue_in: "Queue[bytes | None]",
+    queue_out: Connection,
 ):
     ready_event.set()
     signal.signal(signal.SIGUSR1, shutdown_handler)
     while True:
         try:
-            event = queue_in.get(timeout=1)
-            if event is None:  # Sentinel to exit
+            event_json = queue_in.get(timeout=1)
+            if event_json is None:  # Sentinel to exit
                 break
+            batched_queue: "BatchedQueue[StudioServerEvent]" = BatchedQueue(queue_out)
             try:
-
-                async def async_execute_event(event):
-                    async for event_ in execute_event(event, queue_out):
-                        queue_out.put(event_)
-
-                asyncio.run(async_execute_event(event))
+                event = studio_client_event_adapter.validate_json(event_json)
+                # uvicorn already serves the main process on uvloop when it's available,
+                # use it for the executions on the workers too
+                with asyncio.Runner(
+                    loop_factory=uvloop.new_event_loop if uvloop else None
+                ) as runner:
+                    runner.run(execute_event(event, batched_queue))
             except Exception as e:
-                queue_out.put(Error(payload=ErrorPayload(message=repr(e))))
+                batched_queue.put(Error(payload=ErrorPayload(message=repr(e))))
+                # execute_event didn't get to finish, let the parent stop waiting
+                batched_queue.put(Done())
+            finally:
+                batched_queue.close()
         except queue.Empty:
             continue
 
@@ -159,7 +205,7 @@ def forceful_exit():
 
 class RunningProcess(TypedDict):
     process: Process
-    queue: "Queue[StudioServerEvent]"
+    queue: "PipeReader[list[StudioServerEvent]]"
 
 
 running_processes: Dict[str, RunningProcess] = {}
@@ -167,55 +213,24 @@ running_processes: Dict[str, RunningProcess] = {}
 
 # We execute events on a subprocess because each user might execute completely different code,
 # which can alter the global Python interpreter state in unpredictable ways. DSPy itself does
-# a lot of this. At same time, we want to fork the main process to avoid double RAM spending and
-# startup times.
+# a lot of this. At same time, we want to fork from a preloaded forkserver to avoid double RAM
+# spending and startup times.
 async def execute_event_on_a_subprocess(event: StudioClientEvent):
-    if isinstance(event, StopExecution):
-        if event.payload.trace_id in running_processes:
-            await stop_process(event.payload.trace_id)
-            if event.payload.node_id:
-                yield component_error_event(
-                    trace_id=event.payload.trace_id,
-                    node_id=event.payload.node_id,
-                    error="Interrupted",
-                )
-            else:
-                yield Error(payload=ErrorPayload(message="Interrupted"))
-        return
-
-    if isinstance(event, StopEvaluationExecution):
-        if event.payload.run_id in running_processes:
-            await stop_process(event.payload.run_id)
-            EvaluationReporting.post_results(
-                event.payload.workflow.api_key,
-                {
-                    "experiment_slug": event.payload.workflow.workflow_id,
-                    "run_id": event.payload.run_id,
-                    "timestamps": {
-                        "finished_at": int(time.time() * 1000),
-                        "stopped_at": int(time.time() * 1000),
-                    },
-                },
-            )
-            yield error_evaluation_event(
-                run_id=event.payload.run_id,
-                error="Evaluation Stopped",
-                stopped_at=int(time.time() * 1000),
-            )
+    if isinstance(event, _STOP_EVENTS):
+        for result in await handle_stop(event):
+            yield result
         return
 
-    if isinstance(event, StopOptimizationExecution):
-        if event.payload.run_id in running_processes:
-            await stop_process(event.payload.run_id)
-            yield error_optimization_event(
-                run_id=event.payload.run_id,
-                error="Optimization Stopped",
-                stopped_at=int(time.time() * 1000),
-            )
+    try:
+        # The event is sent as JSON, which pydantic dumps and validates natively,
+        # instead of pickling the whole workflow model tree through the process queue
+        process, queue = await pool.submit(
+            studio_client_event_adapter.dump_json(event)
+        )
+    except RuntimeError as e:
+        yield Error(payload=ErrorPayload(message=f"Unexpected error: {repr(e)}"))
         return
 
-    process, queue = await pool.submit(event)
-
     trace_id = get_trace_id(event)
     if trace_id and trace_id not in running_processes:
         running_processes[trace_id] = RunningProcess(process=process, queue=queue)
@@ -228,93 +243,297 @@ async def execute_event_on_a_subprocess(event: StudioClientEvent):
     try:
         done = False
         last_message_time = time.time()
-        time_since_last_message = 0
-        while time_since_last_message < timeout_without_messages:
-            time_since_last_message = time.time() - last_message_time
+        while time.time() - last_message_time < timeout_without_messages:
             try:
-                result = queue.get(block=False)
-                yield result
-                last_message_time = time.time()
+                results = await queue.get(timeout=1.0)
+            except TimeoutError:
+                # The pipe only reaches EOF once every process holding its writing end
+                # is gone, which might not happen if the worker forked any children
+                if not process.is_alive():
+                    raise Exception("Runtime crashed")
+                continue
+            except EOFError:
+                raise Exception("Runtime crashed")
 
+            last_message_time = time.time()
+            for result in results:
+                yield result
                 if isinstance(result, Done):
                     done = True
                     break
-            except Empty:
-                if timeout_without_messages > 10 and not process.is_alive():
-                    raise Exception("Runtime crashed")
-
-                await asyncio.sleep(0.1)
+            if done:
+                break
 
         if not done:
             # Timeout occurred
             yield Error(payload=ErrorPayload(message="Execution timed out"))
-            kill_process(process)
 
     except Exception as e:
         yield Error(payload=ErrorPayload(message=f"Unexpected error: {repr(e)}"))
     finally:
-        # Ensure the process is terminated and resources are cleaned up
-        if process.is_alive():
-            kill_process(process)
-
-        trace_id = get_trace_id(event)
-        if trace_id and trace_id in running_processes:
-            del running_processes[trace_id]
-
-
-def get_trace_id(event: StudioClientEvent):
-    return (
-        event.payload.trace_id  # type: ignore
-        if hasattr(event.payload, "trace_id")
-        else (
-            event.payload.run_id  # type: ignore
-            if hasattr(event.payload, "run_id")
-            else None
+        # Ensure the process is terminated and resources are cleaned up. Nothing is
+        # awaited here, as this also runs when the request is cancelled because the
+        # client disconnected, and any await would be cancelled again
+        if trace_id:
+            running_processes.pop(trace_id, None)
+
+        queue.close()
+
+        kill_process_in_background(process)
+
+
+# Which payload attribute identifies the execution, for each payload type
+_TRACE_ID_ATTRIBUTES: Dict[type, str] = {
+    ExecuteComponentPayload: "trace_id",
+    StopExecutionPayload: "trace_id",
+    ExecuteFlowPayload: "trace_id",
+    ExecuteEvaluationPayload: "run_id",
+    StopEvaluationExecutionPayload: "run_id",
+    ExecuteOptimizationPayload: "run_id",
+    StopOptimizationExecutionPayload: "run_id",
+}
+
+
+def get_trace_id(event: StudioClientEvent) -> Optional[str]:
+    attribute = _TRACE_ID_ATTRIBUTES.get(type(event.payload))
+    return getattr(event.payload, attribute) if attribute else None
+
+
+_STOP_EVENTS = (StopExecution, StopEvaluationExecution, StopOptimizationExecution)
+
+
+async def handle_stop(
+    event: Union[StopExecution, StopEvaluationExecution, StopOptimizationExecution]
+) -> list[StudioServerEvent]:
+    trace_id = get_trace_id(event)
+    if trace_id not in running_processes:
+        return []
+    await stop_process(trace_id)
+
+    if isinstance(event, StopExecution):
+        if event.payload.node_id:
+            return [
+                component_error_event(
+                    trace_id=event.payload.trace_id,
+                    node_id=event.payload.node_id,
+                    error="Interrupted",
+                )
+            ]
+        return [Error(payload=ErrorPayload(message="Interrupted"))]
+
+    if isinstance(event, StopEvaluationExecution):
+        now = now_ms()
+        EvaluationReporting.post_results(
+            event.payload.workflow.api_key,
+            {
+                "experiment_slug": event.payload.workflow.workflow_id,
+                "run_id": event.payload.run_id,
+                "timestamps": {
+                    "finished_at": now,
+                    "stopped_at": now,
+                },
+            },
         )
-    )
+        return [
+            error_evaluation_event(
+                run_id=event.payload.run_id,
+                error="Evaluation Stopped",
+                stopped_at=now,
+            )
+        ]
+
+    return [
+        error_optimization_event(
+            run_id=event.payload.run_id,
+            error="Optimization Stopped",
+            stopped_at=now_ms(),
+        )
+    ]
 
 
 async def stop_process(trace_id: str):
     queue = running_processes[trace_id]["queue"]
-    queue.put(Done())
+    queue.put_nowait([Done()])
 
     await asyncio.sleep(0.2)
 
     # Check again because the process generally finishes gracefully on its own
-    if trace_id in running_processes:
-        process = running_processes[trace_id]["process"]
-        kill_process(process)
+    running_process = running_processes.pop(trace_id, None)
+    if running_process:
+        await asyncio.shield(kill_process_in_background(running_process["process"]))
 
-        del running_processes[trace_id]
 
+_kill_tasks: "Dict[Process, asyncio.Task[None]]" = {}
 
-def kill_process(process: Process):
-    if process.pid is None:
+
+def kill_process_in_background(process: Process) -> "asyncio.Task[None]":
+    # Runs as its own task so it can't be cancelled halfway together with the request,
+    # and reuses the one in flight if the process is already being killed
+    task = _kill_tasks.get(process)
+    if task is None:
+        task = asyncio.create_task(kill_process(process))
+        _kill_tasks[process] = task
+        task.add_done_callback(lambda _: _kill_tasks.pop(process, None))
+    return task
+
+
+async def kill_process(process: Process):
+    try:
+        alive = process.is_alive()
+    except ValueError:
+        # Already closed by an earlier kill
         return
-    os.kill(process.pid, signal.SIGUSR1)
+
+    if alive:
+        # Give it a chance to exit gracefully, but don't wait for the 3s forceful
+        # exit timer in shutdown_handler if it's stuck
+        os.kill(cast(int, process.pid), signal.SIGUSR1)
+        if not await wait_for_exit(process, timeout=0.3):
+            process.kill()
+            if not await wait_for_exit(process, timeout=2.0):
+                logger.warning("Process %s did not exit after SIGKILL", process.pid)
+                return
+
+    # is_alive() already reaped it, release its file descriptors right away
+    process.close()
+
+
+async def wait_for_exit(process: Process, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while process.is_alive():
+        if time.monotonic() >= deadline:
+            return False
+        await asyncio.sleep(0.05)
+    return True
+
+
+_SSE_PREFIX = b"data: "
+_SSE_SUFFIX = b"\n\n"
+
+
+@functools.cache
+def _model_field_names(cls: type[BaseModel]) -> tuple[str, ...]:
+    return tuple(cls.model_fields.keys())
+
+
+def _fast_dump(value: Any) -> Any:
+    # Equivalent to model_dump(exclude_none=True) for our event models, but reading
+    # the attributes directly with the field names cached per class, leaving
+    # everything else for orjson to serialize natively
+    if isinstance(value, BaseModel):
+        return {
+            name: _fast_dump(field)
+            for name in _model_field_names(type(value))
+            if (field := getattr(value, name)) is not None
+        }
+    return value
+
+
+def encode_event(event: StudioServerEvent) -> bytes:
+    try:
+        data = orjson.dumps(_fast_dump(event))
+    except orjson.JSONEncodeError:
+        # Some values nested in Any fields need pydantic to be serialized
+        data = orjson.dumps(event.model_dump(exclude_none=True, mode="json"))
+    return _SSE_PREFIX + data + _SSE_SUFFIX
 
 
 async def event_encoder(event_generator: AsyncGenerator[StudioServerEvent, None]):
+    # Yielding bytes lets StreamingResponse send them as is, without encoding again
     async for event in event_generator:
-        yield f"data: {json.dumps(event.model_dump(exclude_none=True))}\n\n"
+        yield encode_event(event)
+
+
+async def parse_client_event(request: Request) -> StudioClientEvent:
+    # Validates the raw body in a single pass with the cached discriminated adapter,
+    # instead of FastAPI parsing it to python objects first and validating after
+    try:
+        return studio_client_event_adapter.validate_json(await request.body())
+    except ValidationError as e:
+        # Same error locations FastAPI reports for request bodies
+        raise RequestValidationError(
+            [
+                {**error, "loc": ("body", *error["loc"])}
+                for error in e.errors(include_url=False)
+            ]
+        )
 
 
-@app.post("/execute")
+# The body is parsed by parse_client_event, so FastAPI can't infer its schema for
+# the docs, we declare it here and add the models it references to the components
+_client_event_schema = studio_client_event_adapter.json_schema(
+    ref_template="#/components/schemas/{model}"
+)
+_client_event_openapi = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {
+                "schema": {
+                    key: value
+                    for key, value in _client_event_schema.items()
+                    if key != "$defs"
+                }
+            }
+        },
+    }
+}
+
+
+def studio_openapi():
+    if app.openapi_schema is None:
+        schema = FastAPI.openapi(app)
+        schema.setdefault("components", {}).setdefault("schemas", {}).update(
+            _client_event_schema.get("$defs", {})
+        )
+    return app.openapi_schema
+
+
+app.openapi = studio_openapi
+
+
+def log_received_event(event: StudioClientEvent, sync=False):
+    # Events can carry the whole workflow, so only dump them when debugging
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Received event: %s", event.model_dump_json())
+    else:
+        logger.info(
+            "Received event for %sexecution: type=%s, id=%s",
+            "sync " if sync else "",
+            event.type,
+            get_trace_id(event),
+        )
+
+
+@app.post("/execute", openapi_extra=_client_event_openapi)
 async def execute(
-    event: StudioClientEvent, response: Response, background_tasks: BackgroundTasks
+    response: Response,
+    background_tasks: BackgroundTasks,
+    event: StudioClientEvent = Depends(parse_client_event),
 ):
-    print(f"Received event for execution: {event}", flush=True)
+    log_received_event(event)
     response.headers["Cache-Control"] = "no-cache"
+    if isinstance(event, _STOP_EVENTS):
+        # Stopping is a single reply, so send it in one go instead of streaming it,
+        # still framed as server-sent events as the client expects
+        results = await handle_stop(event)
+        return Response(
+            content=b"".join(encode_event(result) for result in results),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache"},
+        )
     return StreamingResponse(
         event_encoder(execute_event_on_a_subprocess(event)),
         media_type="text/event-stream",
     )
 
 
-@app.post("/execute_sync")
-async def execute_sync(event: StudioClientEvent):
-    print(f"Received event for sync execution: {event}", flush=True)
+@app.post("/execute_sync", openapi_extra=_client_event_openapi)
+async def execute_sync(event: StudioClientEvent = Depends(parse_client_event)):
+    log_received_event(event, sync=True)
 
+    if isinstance(event, ExecuteFlow):
+        event.payload.sync = True
     event_stream = execute_event_on_a_subprocess(event)
 
     # Monitor the stream for the "success" state
@@ -1,6 +1,6 @@
 import asyncio
 from contextlib import contextmanager
-from multiprocessing import Queue
+from langwatch_nlp.studio.process_pool import BatchedQueue
 import threading
 import time
 from typing import Callable, List, Optional, Any, Tuple, Literal, overload
@@ -20,6 +20,7 @@ from langwatch_nlp.studio.types.events import (
     EvaluationStateChange,
     EvaluationStateChangePayload,
     StudioServerEvent,
+    now_ms,
 )
 from langwatch_nlp.studio.utils import get_node_by_id
 
@@ -119,12 +120,12 @@ class EvaluationReporting:
         workflow_version_id: str,
         run_id: str,
         total: int,
-        queue: "Queue[StudioServerEvent]",
+        queue: "BatchedQueue[StudioServerEvent]",
     ):
         self.workflow = workflow
         self.workflow_version_id = workflow_version_id
         self.run_id = run_id
-        self.created_at = int(time.time() * 1000)
+        self.created_at = now_ms()
         self.total = total
         self.progress = 0
         self.queue = queue
@@ -240,7 +241,7 @@ class EvaluationReporting:
             }
 
             if finished:
-                body["timestamps"]["finished_at"] = int(time.time() * 1000)
+                body["timestamps"]["finished_at"] = now_ms()
 
             # Start a new thread to send the batch
             thread = threading.Thread(
@@ -1,4 +1,4 @@
-from multiprocessing import Queue
+from langwatch_nlp.studio.process_pool import BatchedQueue
 from typing import Any, Optional
 import dspy
 
@@ -10,6 +10,7 @@ from langwatch_nlp.studio.types.events import (
     end_component_event,
     start_component_event,
 )
+from langwatch_nlp.studio.utils import get_node_by_id
 from pydantic import BaseModel
 
 
@@ -26,18 +27,18 @@ class ReportingModule(dspy.Module):
         super().__init__()
 
     def set_reporting(
-        self, *, queue: "Queue[StudioServerEvent]", trace_id: str, workflow: Workflow
+        self,
+        *,
+        queue: "BatchedQueue[StudioServerEvent]",
+        trace_id: str,
+        workflow: Workflow,
     ) -> None:
         self.context = ReportingContext(
             queue=queue, trace_id=trace_id, workflow=workflow
         )
 
     def with_reporting(self, module, node_id):
-        node = (
-            next(node for node in self.context.workflow.nodes if node.id == node_id)
-            if self.context
-            else None
-        )
+        node = get_node_by_id(self.context.workflow, node_id) if self.context else None
 
         def wrapper(**kwargs):
             if self.context and node:
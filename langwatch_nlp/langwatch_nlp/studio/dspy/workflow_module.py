@@ -9,7 +9,7 @@ from langwatch_nlp.studio.dspy.evaluation import (
 from langwatch_nlp.studio.dspy.predict_with_metadata import (
     PredictionWithMetadata,
 )
-from langwatch_nlp.studio.parser import autoparse_fields, parse_component
+from langwatch_nlp.studio.parser import compile_fields_parser, parse_component
 from langwatch_nlp.studio.types.dsl import Workflow, Node, Field
 from langwatch_nlp.studio.dspy.reporting_module import ReportingModule
 import dspy
@@ -30,6 +30,7 @@ class WorkflowModule(ReportingModule):
         super().__init__()
         self.workflow = workflow
         self.components: Dict[str, dspy.Module] = {}
+        self.input_parsers: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {}
         self.until_node_id = until_node_id
         self.manual_execution_mode = manual_execution_mode
         self.evaluation_weighting = evaluation_weighting
@@ -40,6 +41,9 @@ class WorkflowModule(ReportingModule):
                 component = parse_component(node, workflow)
                 self.components[node.id] = component
                 setattr(self, validate_identifier(node.id), self.components[node.id])
+                self.input_parsers[node.id] = compile_fields_parser(
+                    node.data.inputs or []
+                )
 
     def forward(self, **kwargs):
         try:
@@ -91,7 +95,7 @@ class WorkflowModule(ReportingModule):
                     ][edge.sourceHandle.split(".")[-1]]
 
         result = self.with_reporting(component, node.id)(
-            **autoparse_fields(node.data.inputs or [], input_args)
+            **self.input_parsers[node.id](input_args)
         )
         if return_inputs:
             return result, input_args
@@ -1,5 +1,5 @@
 from langwatch_nlp.studio.parser import autoparse_fields, parse_component
-from langwatch_nlp.studio.utils import disable_dsp_caching
+from langwatch_nlp.studio.utils import disable_dsp_caching, get_node_by_id
 from langwatch_nlp.studio.types.events import (
     Debug,
     DebugPayload,
@@ -13,7 +13,7 @@ import langwatch
 async def execute_component(event: ExecuteComponentPayload):
     yield Debug(payload=DebugPayload(message="executing component"))
 
-    node = [node for node in event.workflow.nodes if node.id == event.node_id][0]
+    node = get_node_by_id(event.workflow, event.node_id)
     disable_dsp_caching()
 
     yield start_component_event(node, event.trace_id)
@@ -1,5 +1,4 @@
-from multiprocessing import Queue
-import time
+from langwatch_nlp.studio.process_pool import BatchedQueue
 from typing import Optional, cast
 import dspy
 from langwatch_nlp.studio.dspy.evaluation import EvaluationReporting
@@ -21,6 +20,7 @@ from langwatch_nlp.studio.types.events import (
     EvaluationStateChangePayload,
     ExecuteEvaluationPayload,
     StudioServerEvent,
+    now_ms,
 )
 from langwatch_nlp.studio.utils import (
     disable_dsp_caching,
@@ -33,7 +33,7 @@ from sklearn.model_selection import train_test_split
 
 
 async def execute_evaluation(
-    event: ExecuteEvaluationPayload, queue: "Queue[StudioServerEvent]"
+    event: ExecuteEvaluationPayload, queue: "BatchedQueue[StudioServerEvent]"
 ):
     workflow = event.workflow
     run_id = event.run_id
@@ -108,7 +108,8 @@ async def execute_evaluation(
         results = evaluator(module, metric=reporting.evaluate_and_report)
         await reporting.wait_for_completion()
     except Exception as e:
-        yield error_evaluation_event(run_id, str(e), stopped_at=int(time.time() * 1000))
+        now = now_ms()
+        yield error_evaluation_event(run_id, str(e), stopped_at=now)
         if valid:
             EvaluationReporting.post_results(
                 workflow.api_key,
@@ -116,8 +117,8 @@ async def execute_evaluation(
                     "experiment_slug": workflow.workflow_id,
                     "run_id": run_id,
                     "timestamps": {
-                        "finished_at": int(time.time() * 1000),
-                        "stopped_at": int(time.time() * 1000),
+                        "finished_at": now,
+                        "stopped_at": now,
                     },
                 },
             )
@@ -132,7 +133,7 @@ def start_evaluation_event(run_id: str):
             evaluation_state=EvaluationExecutionState(
                 status=ExecutionStatus.running,
                 run_id=run_id,
-                timestamps=Timestamps(started_at=int(time.time() * 1000)),
+                timestamps=Timestamps(started_at=now_ms()),
             )
         )
     )
@@ -144,7 +145,7 @@ def end_evaluation_event(run_id: str):
             evaluation_state=EvaluationExecutionState(
                 status=ExecutionStatus.success,
                 run_id=run_id,
-                timestamps=Timestamps(finished_at=int(time.time() * 1000)),
+                timestamps=Timestamps(finished_at=now_ms()),
             )
         )
     )
@@ -158,7 +159,7 @@ def error_evaluation_event(run_id: str, error: str, stopped_at: Optional[int] =
                 run_id=run_id,
                 error=error,
                 timestamps=Timestamps(
-                    finished_at=int(time.time() * 1000),
+                    finished_at=stopped_at or now_ms(),
                     stopped_at=stopped_at,
                 ),
             )
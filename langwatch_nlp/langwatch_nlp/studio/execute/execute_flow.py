@@ -1,5 +1,4 @@
-from multiprocessing import Queue
-import time
+from langwatch_nlp.studio.process_pool import BatchedQueue
 from typing import Dict, Set, cast
 
 import langwatch
@@ -18,6 +17,7 @@ from langwatch_nlp.studio.types.events import (
     ExecutionStateChange,
     ExecutionStateChangePayload,
     StudioServerEvent,
+    now_ms,
 )
 from langwatch_nlp.studio.utils import (
     ClientReadableValueError,
@@ -28,7 +28,7 @@ from langwatch_nlp.studio.utils import (
 
 async def execute_flow(
     event: ExecuteFlowPayload,
-    queue: "Queue[StudioServerEvent]",
+    queue: "BatchedQueue[StudioServerEvent]",
 ):
     validate_workflow(event.workflow)
 
@@ -63,7 +63,9 @@ async def execute_flow(
                 until_node_id=until_node_id,
                 inputs=inputs[0] if inputs else None,
             )
-            module.set_reporting(queue=queue, trace_id=trace_id, workflow=workflow)
+            if not event.sync:
+                # Nobody is watching the components state on sync executions
+                module.set_reporting(queue=queue, trace_id=trace_id, workflow=workflow)
 
             entry_node = cast(
                 EntryNode,
@@ -112,7 +114,7 @@ def start_workflow_event(workflow: Workflow, trace_id: str):
             execution_state=WorkflowExecutionState(
                 status=ExecutionStatus.running,
                 trace_id=trace_id,
-                timestamps=Timestamps(started_at=int(time.time() * 1000)),
+                timestamps=Timestamps(started_at=now_ms()),
             )
         )
     )
@@ -125,7 +127,7 @@ def end_workflow_event(workflow: Workflow, trace_id: str, result):
             execution_state=WorkflowExecutionState(
                 status=ExecutionStatus.success,
                 trace_id=trace_id,
-                timestamps=Timestamps(finished_at=int(time.time() * 1000)),
+                timestamps=Timestamps(finished_at=now_ms()),
                 result=result.toDict(),
             )
         )
@@ -1,8 +1,7 @@
 from contextlib import contextmanager
 from io import StringIO
-from multiprocessing import Queue
+from langwatch_nlp.studio.process_pool import BatchedQueue
 import sys
-import time
 from typing import Optional, cast
 import dspy
 import langwatch
@@ -38,6 +37,7 @@ from langwatch_nlp.studio.types.events import (
     OptimizationStateChange,
     OptimizationStateChangePayload,
     StudioServerEvent,
+    now_ms,
 )
 from langwatch_nlp.studio.utils import (
     get_input_keys,
@@ -65,7 +65,7 @@ dspy.primitives.module.postprocess_parameter_name = postprocess_parameter_name
 
 
 async def execute_optimization(
-    event: ExecuteOptimizationPayload, queue: "Queue[StudioServerEvent]"
+    event: ExecuteOptimizationPayload, queue: "BatchedQueue[StudioServerEvent]"
 ):
     workflow = event.workflow
     run_id = event.run_id
@@ -203,9 +203,7 @@ async def execute_optimization(
                 )
 
     except Exception as e:
-        yield error_optimization_event(
-            run_id, str(e), stopped_at=int(time.time() * 1000)
-        )
+        yield error_optimization_event(run_id, str(e), stopped_at=now_ms())
         # print stack trace
         import traceback
 
@@ -218,8 +216,8 @@ async def execute_optimization(
         #             "experiment_slug": workflow.workflow_id,
         #             "run_id": run_id,
         #             "timestamps": {
-        #                 "finished_at": int(time.time() * 1000),
-        #                 "stopped_at": int(time.time() * 1000),
+        #                 "finished_at": now_ms(),
+        #                 "stopped_at": now_ms(),
         #             },
         #         },
         #     )
@@ -234,7 +232,7 @@ def start_optimization_event(run_id: str):
             optimization_state=OptimizationExecutionState(
                 status=ExecutionStatus.running,
                 run_id=run_id,
-                timestamps=Timestamps(started_at=int(time.time() * 1000)),
+                timestamps=Timestamps(started_at=now_ms()),
             )
         )
     )
@@ -246,7 +244,7 @@ def end_optimization_event(run_id: str):
             optimization_state=OptimizationExecutionState(
                 status=ExecutionStatus.success,
                 run_id=run_id,
-                timestamps=Timestamps(finished_at=int(time.time() * 1000)),
+                timestamps=Timestamps(finished_at=now_ms()),
             )
         )
     )
@@ -260,7 +258,7 @@ def error_optimization_event(run_id: str, error: str, stopped_at: Optional[int]
                 run_id=run_id,
                 error=error,
                 timestamps=Timestamps(
-                    finished_at=int(time.time() * 1000),
+                    finished_at=stopped_at or now_ms(),
                     stopped_at=stopped_at,
                 ),
             )
@@ -270,14 +268,17 @@ def error_optimization_event(run_id: str, error: str, stopped_at: Optional[int]
 
 class QueueWriter(StringIO):
     def __init__(
-        self, queue: "Queue[StudioServerEvent]", run_id: str, original_stdout=None
+        self,
+        queue: "BatchedQueue[StudioServerEvent]",
+        run_id: str,
+        original_stdout=None,
     ):
         super().__init__()
         self.queue = queue
         self.run_id = run_id
         self.original_stdout = original_stdout
         self.buffer_text = ""
-        self.last_timestamp = int(time.time() * 1000)
+        self.last_timestamp = now_ms()
 
     def write(self, text: str):
         if self.original_stdout:
@@ -285,7 +286,7 @@ class QueueWriter(StringIO):
 
         if text.strip() != "":
             self.buffer_text += text
-        current_timestamp = int(time.time() * 1000)
+        current_timestamp = now_ms()
 
         if self.buffer_text != "" and (
             "\r" not in self.buffer_text
@@ -317,7 +318,9 @@ class QueueWriter(StringIO):
 
 
 @contextmanager
-def redirect_stdout_to_queue(queue: "Queue[StudioServerEvent]", run_id: str):
+def redirect_stdout_to_queue(
+    queue: "BatchedQueue[StudioServerEvent]", run_id: str
+):
     stdout = sys.stdout
     queue_writer_stdout = QueueWriter(queue, run_id, original_stdout=stdout)
     sys.stdout = queue_writer_stdout
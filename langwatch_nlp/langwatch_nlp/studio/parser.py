@@ -1,5 +1,5 @@
 import json
-from typing import Any, Dict, List, Optional, Union, cast
+from typing import Any, Callable, Dict, List, Optional, Union, cast
 from langwatch_nlp.studio.dspy.llm_node import LLMNode
 from langwatch_nlp.studio.dspy.retrieve import ContextsRetriever
 from langwatch_nlp.studio.modules.evaluators.langwatch import LangWatchEvaluator
@@ -34,6 +34,7 @@ import httpx
 
 
 from langwatch_nlp.studio.utils import (
+    get_node_by_id,
     node_llm_config_to_dspy_lm,
     transpose_inline_dataset_to_object_list,
 )
@@ -56,13 +57,20 @@ def parse_component(node: Node, workflow: Workflow) -> dspy.Module:
             raise NotImplementedError(f"Unknown component type: {node.type}")
 
 
+# Custom nodes are called once per example on evaluations and optimizations, so we
+# keep the connections to LangWatch alive instead of paying a new handshake every time
+_http_client = httpx.Client(
+    timeout=30, limits=httpx.Limits(max_keepalive_connections=32)
+)
+
+
 def apiCall(inputs, api_key, endpoint, workflow_id, version_id):
 
     url = endpoint + "/api/optimization/" + workflow_id
     if version_id:
         url += "/" + version_id
 
-    response = httpx.post(
+    response = _http_client.post(
         url,
         headers={"X-Auth-Token": api_key},
         json=inputs,
@@ -124,13 +132,9 @@ def parse_signature(
         try:
             decorator_node = cast(
                 PromptingTechniqueNode,
-                next(
-                    node
-                    for node in workflow.nodes
-                    if node.id == prompting_technique.ref
-                ),
+                get_node_by_id(workflow, prompting_technique.ref),
             )
-        except StopIteration:
+        except ValueError:
             raise ValueError(f"Decorator node {prompting_technique.ref} not found")
         PromptingTechniqueClass = parse_prompting_technique(decorator_node.data)
         predict = PromptingTechniqueClass(SignatureClass) # type: ignore
@@ -208,52 +212,87 @@ def parse_fields(fields: List[Field], autoparse=True) -> Dict[str, Any]:
 
 
 def autoparse_field_value(field: Field, value: Optional[Any]) -> Optional[Any]:
-    if type(value) == str and (
-        value.startswith("{") or value.startswith("[") or value.startswith('"')
-    ):
+    return _FIELD_PARSERS[field.type](value)
+
+
+def autoparse_fields(fields: List[Field], values: Dict[str, Any]) -> Dict[str, Any]:
+    return compile_fields_parser(fields)(values)
+
+
+def compile_fields_parser(
+    fields: List[Field],
+) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """Resolves the parser for each field once, to be applied to many values later."""
+    compiled = {field.identifier: _FIELD_PARSERS[field.type] for field in fields}
+
+    def parse(values: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            identifier: parser(values[identifier])
+            for identifier, parser in compiled.items()
+            if identifier in values
+        }
+
+    return parse
+
+
+_JSON_STARTS = frozenset('{["')
+_json_loads = json.loads
+
+
+def _parse_json_like(value: Any) -> Any:
+    # Single lookup on the first char, which is also safe for empty strings
+    if isinstance(value, str) and value[:1] in _JSON_STARTS:
         try:
-            value = json.loads(value)
+            return _json_loads(value)
         except ValueError:
             pass
-    if value is None:
-        return None
-
-    if field.type == FieldType.int:
-        return int(value)
-    if field.type == FieldType.float:
-        return float(value)
-    if field.type == FieldType.bool:
-        return bool(value)
-    if field.type == FieldType.str:
-        if type(value) == str:
-            return value
-        try:
-            return json.dumps(value)
-        except Exception:
-            if isinstance(value, object):
-                return repr(value)
-            return str(value)
-    if field.type == FieldType.list_str and not isinstance(value, list):
-        return [
-            autoparse_field_value(
-                Field(identifier=field.identifier, type=FieldType.str), value
-            )
-        ]
-    if field.type == FieldType.llm:
-        return LLMConfig.model_validate(value)
-    if field.type == FieldType.prompting_technique:
-        return NodeRef.model_validate(value)
-    if field.type == FieldType.dataset:
-        return NodeDataset.model_validate(value)
     return value
 
 
-def autoparse_fields(fields: List[Field], values: Dict[str, Any]) -> Dict[str, Any]:
-    parsed_values = {}
-    for field in fields:
-        if not field.identifier in values:
-            continue
-        parsed_values[field.identifier] = autoparse_field_value(
-            field, values[field.identifier]
-        )
-    return parsed_values
+def _to_str(value: Any) -> str:
+    if type(value) == str:
+        return value
+    try:
+        return json.dumps(value)
+    except Exception:
+        if isinstance(value, object):
+            return repr(value)
+        return str(value)
+
+
+def _to_list_str(value: Any) -> Any:
+    if isinstance(value, list):
+        return value
+    return [_to_str(value)]
+
+
+_TYPED_PARSERS: Dict[FieldType, Callable[[Any], Any]] = {
+    FieldType.int: int,
+    FieldType.float: float,
+    FieldType.bool: bool,
+    FieldType.str: _to_str,
+    FieldType.list_str: _to_list_str,
+    FieldType.llm: LLMConfig.model_validate,
+    FieldType.prompting_technique: NodeRef.model_validate,
+    FieldType.dataset: NodeDataset.model_validate,
+}
+
+
+def _compile_field_parser(field_type: FieldType) -> Callable[[Any], Any]:
+    typed_parser = _TYPED_PARSERS.get(field_type)
+
+    if typed_parser is None:
+        return _parse_json_like
+
+    def parser(value: Any) -> Any:
+        value = _parse_json_like(value)
+        if value is None:
+            return None
+        return typed_parser(value)
+
+    return parser
+
+
+_FIELD_PARSERS: Dict[FieldType, Callable[[Any], Any]] = {
+    field_type: _compile_field_parser(field_type) for field_type in FieldType
+}
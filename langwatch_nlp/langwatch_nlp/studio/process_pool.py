@@ -1,11 +1,12 @@
 import asyncio
 import multiprocessing
-from multiprocessing import Event, Queue
+from multiprocessing import Queue
+from multiprocessing.connection import Connection
 from multiprocessing.synchronize import Event as EventType
 import sys
 import threading
 import time
-from typing import Callable, Generic, TypeVar
+from typing import Callable, Generic, Optional, TypeVar
 
 T = TypeVar("T")
 U = TypeVar("U")
@@ -14,78 +15,239 @@ U = TypeVar("U")
 class IsolatedProcessPool(Generic[T, U]):
     def __init__(
         self,
-        worker: "Callable[[EventType, Queue[T | None], Queue[U]], None]",
-        size=4,
+        worker: "Callable[[EventType, Queue[T | None], Connection], None]",
+        max_concurrent_spawns=4,
+        min_idle=1,
+        context="forkserver",
     ):
         self.worker = worker
-        self.size = size
+        self.max_concurrent_spawns = max_concurrent_spawns
+        self.min_idle = min_idle
+        # Workers are forked from a forkserver that already has the heavy modules
+        # preloaded (see multiprocessing.set_forkserver_preload), so starting one
+        # on demand is cheap and we only need to keep a few warm
+        self.ctx = multiprocessing.get_context(context)
+        # The first spawn also waits for the forkserver to start and import the
+        # preloaded modules, which can take a while on a cold start
+        self.booted = threading.Event()
 
         self.idle_processes: (
-            "list[tuple[multiprocessing.Process, Queue[T | None], Queue[U]]]"
+            "list[tuple[multiprocessing.Process, Queue[T | None], PipeReader[U]]]"
         ) = []
+        self.lock = threading.Lock()
+        # Bounds how many workers can be starting up at the same time
+        self.spawning = threading.Semaphore(max_concurrent_spawns)
         self.running = True
         self.fill_thread = threading.Thread(target=self._fill_pool_continuously)
         self.fill_thread.daemon = True
         self.fill_thread.start()
 
     def _create_process(self):
-        queue_in: "Queue[T | None]" = Queue()
-        queue_out: "Queue[U]" = Queue()
-        ready_event = Event()
-        p = multiprocessing.Process(
+        queue_in: "Queue[T | None]" = self.ctx.Queue()
+        # A one-way pipe per worker has a single producer and a single consumer, so it
+        # skips the feeder thread and lock that a multiprocessing.Queue carries
+        reader_conn, writer_conn = self.ctx.Pipe(duplex=False)
+        ready_event = self.ctx.Event()
+        p = self.ctx.Process(
             target=self.worker,
-            args=(ready_event, queue_in, queue_out),
+            args=(ready_event, queue_in, writer_conn),
         )
         p.start()
+        # Only the worker should hold the writing end, so we get EOF when it dies
+        writer_conn.close()
+        queue_out: "PipeReader[U]" = PipeReader(reader_conn)
         return p, queue_in, queue_out, ready_event
 
+    def _spawn(self, timeout=10, boot_timeout=120):
+        with self.spawning:
+            process, queue_in, queue_out, ready_event = self._create_process()
+            if not ready_event.wait(
+                timeout=timeout if self.booted.is_set() else boot_timeout
+            ):
+                process.kill()
+                process.join()
+                queue_out.close()
+                raise RuntimeError(
+                    "Timeout while waiting for a process to become available"
+                )
+            self.booted.set()
+            print(f"[ProcessPool] Process ready")
+            sys.stdout.flush()
+            return process, queue_in, queue_out
+
     def _fill_pool_continuously(self):
         while self.running:
-            if len(self.idle_processes) < self.size:
-                print(
-                    f"[ProcessPool] Creating {self.size - len(self.idle_processes)} processes"
-                )
+            if len(self.idle_processes) < self.min_idle:
+                print(f"[ProcessPool] Creating warm process")
                 sys.stdout.flush()
-                process_creations = [
-                    self._create_process()
-                    for _ in range(self.size - len(self.idle_processes))
-                ]
-                for process, queue_in, queue_out, ready_event in process_creations:
-                    ready_event.wait()
-                    print(f"[ProcessPool] Process ready")
-                    sys.stdout.flush()
-                    self.idle_processes.append((process, queue_in, queue_out))
+                try:
+                    process = self._spawn()
+                except RuntimeError as e:
+                    print(f"[ProcessPool] {e}", file=sys.stderr)
+                    continue
+                with self.lock:
+                    self.idle_processes.append(process)
             else:
                 time.sleep(0.1)
 
-    async def submit(self, event: T) -> tuple[multiprocessing.Process, "Queue[U]"]:
-        start_time = time.time()
-        while True:
-            try:
+    async def submit(
+        self, event: T
+    ) -> tuple[multiprocessing.Process, "PipeReader[U]"]:
+        if not self.running:
+            raise RuntimeError("Pool is shutting down")
+
+        try:
+            with self.lock:
                 process, queue_in, queue_out = self.idle_processes.pop(0)
-                print(f"[ProcessPool] Process popped")
-                sys.stdout.flush()
-                break
-            except IndexError:
-                print(f"[ProcessPool] No idle processes, waiting for new one")
-                sys.stdout.flush()
-                if not self.running:
-                    raise RuntimeError("Pool is shutting down")
-                elif time.time() - start_time > 10:
-                    raise RuntimeError(
-                        "Timeout while waiting for a process to become available"
-                    )
-                else:
-                    await asyncio.sleep(0.1)
+            print(f"[ProcessPool] Process popped")
+            sys.stdout.flush()
+        except IndexError:
+            print(f"[ProcessPool] No idle processes, spawning a new one")
+            sys.stdout.flush()
+            spawned = asyncio.get_running_loop().run_in_executor(None, self._spawn)
+            try:
+                process, queue_in, queue_out = await asyncio.shield(spawned)
+            except asyncio.CancelledError:
+                # The request is gone but the worker will still start, don't leak it
+                spawned.add_done_callback(self._reclaim_spawned)
+                raise
 
         queue_in.put(event)
         return process, queue_out
 
+    def _reclaim_spawned(self, spawned: "asyncio.Future"):
+        if spawned.cancelled() or spawned.exception() is not None:
+            return
+        process, queue_in, queue_out = spawned.result()
+        if self.running:
+            with self.lock:
+                self.idle_processes.append((process, queue_in, queue_out))
+        else:
+            process.kill()
+            process.join()
+            queue_out.close()
+
     def shutdown(self):
         self.running = False
         self.fill_thread.join()
 
         while len(self.idle_processes) > 0:
-            process, queue_in, _ = self.idle_processes.pop()
+            with self.lock:
+                process, queue_in, queue_out = self.idle_processes.pop()
             queue_in.put(None)  # Send exit sentinel
             process.join()
+            queue_out.close()
+
+
+class BatchedQueue(Generic[U]):
+    """
+    Coalesces items put from the worker side into lists before sending them through
+    the pipe connection, so bursts of events pay a single pickle and IPC wakeup.
+    A batch is flushed once it reaches `max_batch_size` or after `max_delay` seconds.
+    """
+
+    def __init__(self, connection: Connection, max_batch_size=16, max_delay=0.005):
+        self.connection = connection
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+
+        self.buffer: list[U] = []
+        self.condition = threading.Condition()
+        self.running = True
+        self.flush_thread = threading.Thread(target=self._flush_periodically)
+        self.flush_thread.daemon = True
+        self.flush_thread.start()
+
+    def put(self, item: U):
+        with self.condition:
+            self.buffer.append(item)
+            if len(self.buffer) >= self.max_batch_size:
+                self._flush()
+            elif len(self.buffer) == 1:
+                self.condition.notify()
+
+    def put_nowait(self, item: U):
+        self.put(item)
+
+    def _flush(self):
+        if not self.buffer:
+            return
+        batch, self.buffer = self.buffer, []
+        try:
+            self.connection.send(batch)
+        except Exception:
+            # Retry one by one, so an event that can't be pickled is the only one lost
+            # instead of taking the flush thread and the rest of the execution with it
+            for item in batch:
+                try:
+                    self.connection.send([item])
+                except Exception as e:
+                    print(f"[BatchedQueue] Dropping event: {repr(e)}", file=sys.stderr)
+
+    def _flush_periodically(self):
+        with self.condition:
+            while self.running:
+                if not self.buffer:
+                    self.condition.wait()
+                    continue
+                self.condition.wait(self.max_delay)
+                self._flush()
+
+    def close(self):
+        with self.condition:
+            self.running = False
+            self._flush()
+            self.condition.notify()
+        self.flush_thread.join()
+
+
+class PipeReader(Generic[U]):
+    """
+    Parent side of a worker pipe. Once a consumer starts waiting on it, the pipe is
+    registered on the event loop, and everything the worker writes is drained into an
+    asyncio.Queue as soon as it arrives, so `get` just awaits on that queue and raises
+    EOFError if the worker is gone. Items can also be pushed locally with `put_nowait`,
+    e.g. to wake up the consumer when the execution is stopped.
+    """
+
+    def __init__(self, connection: Connection):
+        self.connection = connection
+        self.queue: "asyncio.Queue[U | _PipeClosed]" = asyncio.Queue()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def get(self, timeout: float) -> U:
+        if self.loop is None:
+            self.loop = asyncio.get_running_loop()
+            self.loop.add_reader(self.connection.fileno(), self._drain)
+
+        item = await asyncio.wait_for(self.queue.get(), timeout)
+        if isinstance(item, _PipeClosed):
+            raise EOFError("Worker pipe closed")
+        return item
+
+    def put_nowait(self, item: U):
+        self.queue.put_nowait(item)
+
+    def _drain(self):
+        try:
+            while self.connection.poll():
+                self.queue.put_nowait(self.connection.recv())
+        except Exception as e:
+            # Either EOF or something we can't read anymore, stop waiting on it
+            if not isinstance(e, EOFError):
+                print(f"[PipeReader] Failed to read: {repr(e)}", file=sys.stderr)
+            self._remove_reader()
+            self.queue.put_nowait(_PipeClosed())
+
+    def _remove_reader(self):
+        if self.loop is not None:
+            self.loop.remove_reader(self.connection.fileno())
+            self.loop = None
+
+    def close(self):
+        self._remove_reader()
+        self.connection.close()
+
+
+class _PipeClosed:
+    pass
@@ -273,3 +273,4 @@ class Workflow(BaseModel):
     nodes: List[Node]
     edges: List[Edge]
     state: WorkflowState
+    _node_index: Optional[Dict[str, Node]] = None
@@ -1,6 +1,6 @@
 import time
-from typing import Any, Dict, Optional, Union, List
-from pydantic import BaseModel
+from typing import Annotated, Any, Dict, Optional, Union, List
+from pydantic import BaseModel, Discriminator, TypeAdapter
 from typing_extensions import Literal
 from langwatch_nlp.studio.types.dsl import (
     EvaluationExecutionState,
@@ -15,6 +15,11 @@ from langwatch_nlp.studio.types.dsl import (
 )
 
 
+def now_ms() -> int:
+    """Current unix timestamp in milliseconds, as an int straight from the clock."""
+    return time.time_ns() // 1_000_000
+
+
 class IsAlive(BaseModel):
     type: Literal["is_alive"] = "is_alive"
     payload: dict = {}
@@ -51,6 +56,8 @@ class ExecuteFlowPayload(BaseModel):
     until_node_id: Optional[str] = None
     inputs: Optional[List[Dict[str, Any]]] = None
     manual_execution_mode: Optional[bool] = None
+    # Set by /execute_sync, which only waits for the final result
+    sync: bool = False
 
 
 class ExecuteFlow(BaseModel):
@@ -112,17 +119,26 @@ class StopOptimizationExecution(BaseModel):
     payload: StopOptimizationExecutionPayload
 
 
-StudioClientEvent = Union[
-    IsAlive,
-    ExecuteComponent,
-    StopExecution,
-    ExecuteFlow,
-    ExecuteEvaluation,
-    StopEvaluationExecution,
-    ExecuteOptimization,
-    StopOptimizationExecution,
+# Discriminating by type lets pydantic pick the right model right away, instead of
+# trying to validate the event against each one of them in order
+StudioClientEvent = Annotated[
+    Union[
+        IsAlive,
+        ExecuteComponent,
+        StopExecution,
+        ExecuteFlow,
+        ExecuteEvaluation,
+        StopEvaluationExecution,
+        ExecuteOptimization,
+        StopOptimizationExecution,
+    ],
+    Discriminator("type"),
 ]
 
+studio_client_event_adapter: TypeAdapter[StudioClientEvent] = TypeAdapter(
+    StudioClientEvent
+)
+
 
 class IsAliveResponse(BaseModel):
     type: Literal["is_alive_response"] = "is_alive_response"
@@ -187,15 +203,18 @@ class Done(BaseModel):
     type: Literal["done"] = "done"
 
 
-StudioServerEvent = Union[
-    IsAliveResponse,
-    ComponentStateChange,
-    ExecutionStateChange,
-    EvaluationStateChange,
-    OptimizationStateChange,
-    Debug,
-    Error,
-    Done,
+StudioServerEvent = Annotated[
+    Union[
+        IsAliveResponse,
+        ComponentStateChange,
+        ExecutionStateChange,
+        EvaluationStateChange,
+        OptimizationStateChange,
+        Debug,
+        Error,
+        Done,
+    ],
+    Discriminator("type"),
 ]
 
 
@@ -205,7 +224,7 @@ def start_component_event(
     execution_state = ExecutionState(
         status=ExecutionStatus.running,
         trace_id=trace_id,
-        timestamps=Timestamps(started_at=int(time.time() * 1000)),
+        timestamps=Timestamps(started_at=now_ms()),
     )
     if inputs:
         execution_state.inputs = inputs
@@ -226,7 +245,7 @@ def end_component_event(
             execution_state=ExecutionState(
                 status=ExecutionStatus.success,
                 trace_id=trace_id,
-                timestamps=Timestamps(finished_at=int(time.time() * 1000)),
+                timestamps=Timestamps(finished_at=now_ms()),
                 outputs=outputs,
                 cost=cost,
             ),
@@ -241,7 +260,7 @@ def component_error_event(trace_id: str, node_id: str, error: str):
             execution_state=ExecutionState(
                 status=ExecutionStatus.error,
                 error=error,
-                timestamps=Timestamps(finished_at=int(time.time() * 1000)),
+                timestamps=Timestamps(finished_at=now_ms()),
             ),
         )
     )
@@ -97,7 +97,13 @@ def transpose_inline_dataset_to_object_list(
 
 
 def get_node_by_id(workflow: Workflow, node_id: str) -> Node:
-    return next(node for node in workflow.nodes if node.id == node_id)
+    # Nodes are looked up by id for every edge on every execution, so index them once
+    if workflow._node_index is None:
+        workflow._node_index = {node.id: node for node in workflow.nodes}
+    try:
+        return workflow._node_index[node_id]
+    except KeyError:
+        raise ValueError(f"Node {node_id} not found")
 
 
 def get_input_keys(workflow: Workflow) -> List[str]:
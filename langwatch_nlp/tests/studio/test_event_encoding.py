@@ -0,0 +1,103 @@
+import orjson
+import pytest
+
+from langwatch_nlp.studio.app import encode_event
+from langwatch_nlp.studio.types.dsl import (
+    EvaluationExecutionState,
+    ExecutionState,
+    ExecutionStatus,
+    LLMConfig,
+    OptimizationExecutionState,
+    Timestamps,
+    WorkflowExecutionState,
+)
+from langwatch_nlp.studio.types.events import (
+    ComponentStateChange,
+    ComponentStateChangePayload,
+    Debug,
+    DebugPayload,
+    Done,
+    Error,
+    ErrorPayload,
+    EvaluationStateChange,
+    EvaluationStateChangePayload,
+    ExecutionStateChange,
+    ExecutionStateChangePayload,
+    IsAliveResponse,
+    OptimizationStateChange,
+    OptimizationStateChangePayload,
+    StudioServerEvent,
+    component_error_event,
+)
+
+
+@pytest.mark.parametrize(
+    "event",
+    [
+        IsAliveResponse(),
+        ComponentStateChange(
+            payload=ComponentStateChangePayload(
+                component_id="generate_answer",
+                execution_state=ExecutionState(
+                    status=ExecutionStatus.success,
+                    trace_id="trace_123",
+                    inputs={"question": "What is the capital of France?"},
+                    outputs={"answer": "Paris", "score": None},
+                    cost=0.0012,
+                    timestamps=Timestamps(started_at=1, finished_at=2),
+                ),
+            )
+        ),
+        component_error_event(
+            trace_id="trace_123", node_id="generate_answer", error="Interrupted"
+        ),
+        ExecutionStateChange(
+            payload=ExecutionStateChangePayload(
+                execution_state=WorkflowExecutionState(
+                    status=ExecutionStatus.success,
+                    trace_id="trace_123",
+                    timestamps=Timestamps(finished_at=2),
+                    result={"end": {"answer": "Paris"}},
+                )
+            )
+        ),
+        EvaluationStateChange(
+            payload=EvaluationStateChangePayload(
+                evaluation_state=EvaluationExecutionState(
+                    run_id="run_123",
+                    status=ExecutionStatus.running,
+                    progress=1,
+                    total=10,
+                )
+            )
+        ),
+        OptimizationStateChange(
+            payload=OptimizationStateChangePayload(
+                optimization_state=OptimizationExecutionState(
+                    run_id="run_123", status=ExecutionStatus.running, stdout="..."
+                )
+            )
+        ),
+        Debug(payload=DebugPayload(message="Received event")),
+        Error(payload=ErrorPayload(message="Something went wrong")),
+        Done(),
+        # Models nested in Any fields are not serializable by orjson directly
+        ComponentStateChange(
+            payload=ComponentStateChangePayload(
+                component_id="generate_answer",
+                execution_state=ExecutionState(
+                    status=ExecutionStatus.success,
+                    outputs={"llm": LLMConfig(model="openai/gpt-4o")},
+                ),
+            )
+        ),
+    ],
+)
+def test_encode_event(event: StudioServerEvent):
+    encoded = encode_event(event)
+
+    assert encoded.startswith(b"data: ")
+    assert encoded.endswith(b"\n\n")
+    assert orjson.loads(encoded[6:-2]) == event.model_dump(
+        exclude_none=True, mode="json"
+    )
@@ -0,0 +1,37 @@
+from langwatch_nlp.studio.parser import autoparse_field_value, autoparse_fields
+from langwatch_nlp.studio.types.dsl import Field, FieldType, LLMConfig
+
+
+def test_autoparse_field_value():
+    def parse(type_: FieldType, value):
+        return autoparse_field_value(Field(identifier="foo", type=type_), value)
+
+    assert parse(FieldType.int, "42") == 42
+    assert parse(FieldType.float, "4.2") == 4.2
+    assert parse(FieldType.bool, "true") is True
+    assert parse(FieldType.str, "hello") == "hello"
+    assert parse(FieldType.str, "") == ""
+    assert parse(FieldType.str, '"quoted"') == "quoted"
+    assert parse(FieldType.str, '{"a": 1}') == '{"a": 1}'
+    assert parse(FieldType.str, {"a": 1}) == '{"a": 1}'
+    assert parse(FieldType.str, "{not json") == "{not json"
+    assert parse(FieldType.list_str, "hello") == ["hello"]
+    assert parse(FieldType.list_str, '["a", "b"]') == ["a", "b"]
+    assert parse(FieldType.dict, '{"a": 1}') == {"a": 1}
+    assert parse(FieldType.llm, '{"model": "openai/gpt-4o"}') == LLMConfig(
+        model="openai/gpt-4o"
+    )
+    assert parse(FieldType.int, None) is None
+
+
+def test_autoparse_fields():
+    fields = [
+        Field(identifier="question", type=FieldType.str),
+        Field(identifier="count", type=FieldType.int),
+        Field(identifier="missing", type=FieldType.str),
+    ]
+
+    assert autoparse_fields(fields, {"question": "hi", "count": "3", "extra": 1}) == {
+        "question": "hi",
+        "count": 3,
+    }
@@ -0,0 +1,198 @@
+import asyncio
+import threading
+from multiprocessing import Pipe
+
+import pytest
+
+from langwatch_nlp.studio.process_pool import (
+    BatchedQueue,
+    IsolatedProcessPool,
+    PipeReader,
+)
+
+
+def test_batched_queue_flushes_full_batches():
+    reader, writer = Pipe(duplex=False)
+    queue = BatchedQueue(writer, max_batch_size=4, max_delay=10)
+
+    for i in range(8):
+        queue.put(i)
+
+    assert reader.poll(1)
+    assert reader.recv() == [0, 1, 2, 3]
+    assert reader.poll(1)
+    assert reader.recv() == [4, 5, 6, 7]
+
+    queue.close()
+
+
+def test_batched_queue_flushes_single_item_after_max_delay():
+    reader, writer = Pipe(duplex=False)
+    queue = BatchedQueue(writer, max_batch_size=16, max_delay=0.2)
+
+    queue.put("foo")
+
+    assert not reader.poll(0.05)
+    assert reader.poll(1)
+    assert reader.recv() == ["foo"]
+
+    queue.close()
+
+
+def test_batched_queue_preserves_order():
+    reader, writer = Pipe(duplex=False)
+    queue = BatchedQueue(writer, max_batch_size=16, max_delay=0.001)
+
+    for i in range(100):
+        queue.put(i)
+    queue.close()
+    writer.close()
+
+    received = []
+    while True:
+        try:
+            received += reader.recv()
+        except EOFError:
+            break
+
+    assert received == list(range(100))
+
+
+def test_batched_queue_flushes_remainder_on_close():
+    reader, writer = Pipe(duplex=False)
+    queue = BatchedQueue(writer, max_batch_size=16, max_delay=10)
+
+    for i in range(3):
+        queue.put(i)
+    queue.close()
+
+    assert reader.poll(0)
+    assert reader.recv() == [0, 1, 2]
+
+
+def test_batched_queue_drops_only_unpicklable_items():
+    reader, writer = Pipe(duplex=False)
+    queue = BatchedQueue(writer, max_batch_size=4, max_delay=0.001)
+
+    for item in [0, 1, threading.Lock(), 3, 4, 5]:
+        queue.put(item)
+    queue.close()
+    writer.close()
+
+    received = []
+    while True:
+        try:
+            received += reader.recv()
+        except EOFError:
+            break
+
+    assert received == [0, 1, 3, 4, 5]
+
+
+def echo_worker(ready_event, queue_in, queue_out):
+    ready_event.set()
+    while (event := queue_in.get()) is not None:
+        queue_out.send([event, "done"])
+
+
+@pytest.mark.asyncio
+async def test_pool_runs_events_on_warm_and_spawned_workers():
+    pool = IsolatedProcessPool(echo_worker, max_concurrent_spawns=2, min_idle=1)
+    try:
+        # Submitted right away, the first ones can't all have been warmed up yet
+        submitted = await asyncio.gather(*(pool.submit(event) for event in range(3)))
+        for event, (process, queue) in enumerate(submitted):
+            assert await queue.get(timeout=30) == [event, "done"]
+            process.kill()
+            process.join()
+            queue.close()
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_pool_keeps_worker_spawned_for_cancelled_submit():
+    pool = IsolatedProcessPool(echo_worker, max_concurrent_spawns=1, min_idle=0)
+    try:
+        submit = asyncio.create_task(pool.submit("foo"))
+        await asyncio.sleep(0.01)
+        submit.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await submit
+
+        for _ in range(300):
+            if pool.idle_processes:
+                break
+            await asyncio.sleep(0.1)
+        assert len(pool.idle_processes) == 1
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_pipe_reader_receives_items_in_order():
+    reader, writer = Pipe(duplex=False)
+    queue = PipeReader(reader)
+
+    writer.send([1, 2])
+    writer.send([3])
+
+    assert await queue.get(timeout=1) == [1, 2]
+    assert await queue.get(timeout=1) == [3]
+
+    queue.close()
+
+
+@pytest.mark.asyncio
+async def test_pipe_reader_times_out():
+    reader, writer = Pipe(duplex=False)
+    queue = PipeReader(reader)
+
+    with pytest.raises(TimeoutError):
+        await queue.get(timeout=0.05)
+
+    queue.close()
+
+
+@pytest.mark.asyncio
+async def test_pipe_reader_raises_eof_when_writer_is_closed():
+    reader, writer = Pipe(duplex=False)
+    queue = PipeReader(reader)
+
+    writer.send([1])
+    writer.close()
+
+    assert await queue.get(timeout=1) == [1]
+    with pytest.raises(EOFError):
+        await queue.get(timeout=1)
+
+    queue.close()
+
+
+@pytest.mark.asyncio
+async def test_pipe_reader_raises_eof_when_items_cant_be_read():
+    reader, writer = Pipe(duplex=False)
+    queue = PipeReader(reader)
+
+    writer.send_bytes(b"not a pickle")
+
+    with pytest.raises(EOFError):
+        await queue.get(timeout=1)
+
+    queue.close()
+
+
+@pytest.mark.asyncio
+async def test_pipe_reader_put_nowait_wakes_pending_get():
+    reader, writer = Pipe(duplex=False)
+    queue = PipeReader(reader)
+
+    pending = asyncio.create_task(queue.get(timeout=1))
+    await asyncio.sleep(0.05)
+    assert not pending.done()
+
+    queue.put_nowait(["stop"])
+
+    assert await pending == ["stop"]
+
+    queue.close()